@@ -13,6 +13,7 @@ from .models import (
     ClobApiKeyCreds,
     GammaAuth,
     Trade,
+    TradeLite,
     Comment,
     Reaction
 )
@@ -26,6 +27,7 @@ __all__ = [
     'ClobApiKeyCreds',
     'GammaAuth',
     'Trade',
+    'TradeLite',
     'Comment',
     'Reaction'
 ] 
\ No newline at end of file
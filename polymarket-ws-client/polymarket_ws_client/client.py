@@ -2,91 +2,179 @@ import json
 import asyncio
 import logging
 import ssl
-import certifi
-from typing import Optional, Callable, Dict, Any, Union
-from websockets import connect, WebSocketClientProtocol
-from web3 import Web3
+import sys
+from typing import Optional, Callable, Dict, Any, Union, Tuple, Type, Sized
+from pydantic import BaseModel
+from websockets.asyncio.client import connect, ClientConnection
+from websockets.exceptions import ConnectionClosedOK
 from .models import (
-    Message, SubscriptionMessage, Trade, Comment,
+    Message, SubscriptionMessage, Trade, TradeLite, Comment,
     Reaction, ClobApiKeyCreds, GammaAuth
 )
 
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_HOST = "wss://ws-live-data.polymarket.com"
 DEFAULT_PING_INTERVAL = 5000  # milliseconds
+MAX_BATCH_SIZE = 128  # frames processed per event loop iteration
+
+PayloadType = Union[Trade, TradeLite, Comment, Reaction, Dict[str, Any]]
 
-PayloadType = Union[Trade, Comment, Reaction, Dict[str, Any]]
+# Known topics and payload types, interned once at import time
+_TOPIC_ACTIVITY = sys.intern("activity")
+_TOPIC_COMMENTS = sys.intern("comments")
+_TYPE_TRADES = sys.intern("trades")
+_TYPE_COMMENT_CREATED = sys.intern("comment_created")
+_TYPE_COMMENT_REMOVED = sys.intern("comment_removed")
+_TYPE_REACTION_CREATED = sys.intern("reaction_created")
+_TYPE_REACTION_REMOVED = sys.intern("reaction_removed")
+
+# Maps (topic, type) pairs to the model used to parse their payloads. The
+# tuple lookup is the only string comparison on the hot path.
+_PAYLOAD_DISPATCH: Dict[Tuple[str, str], Type[BaseModel]] = {
+    (_TOPIC_ACTIVITY, _TYPE_TRADES): Trade,
+    (_TOPIC_COMMENTS, _TYPE_COMMENT_CREATED): Comment,
+    (_TOPIC_COMMENTS, _TYPE_COMMENT_REMOVED): Comment,
+    (_TOPIC_COMMENTS, _TYPE_REACTION_CREATED): Reaction,
+    (_TOPIC_COMMENTS, _TYPE_REACTION_REMOVED): Reaction,
+}
 
 class PolymarketWSClient:
     def __init__(
         self,
         on_connect: Optional[Callable[['PolymarketWSClient'], None]] = None,
-        on_message: Optional[Callable[['PolymarketWSClient', Message], None]] = None,
+        on_message: Optional[Callable[['PolymarketWSClient', Union[Message, Dict[str, Any]]], None]] = None,
         host: str = DEFAULT_HOST,
         ping_interval: int = DEFAULT_PING_INTERVAL,
         auto_reconnect: bool = True,
         web3_provider: Optional[str] = None,
-        ssl_verify: bool = True
+        ssl_verify: bool = True,
+        trade_model: Type[BaseModel] = Trade,
+        raw: bool = False,
+        compression: Optional[str] = "deflate",
+        max_size: Optional[int] = 2**20,
+        max_queue: int = 16,
+        write_limit: int = 2**16,
+        inbox_max: int = 1000
     ):
         """
         Initialize the Polymarket WebSocket client.
         
         Args:
             on_connect: Callback function when connection is established
-            on_message: Callback function for handling incoming messages
+            on_message: Callback function for handling incoming messages.
+                Callbacks may be sync or async; both run on the event loop,
+                so a blocking callback stalls message processing.
             host: WebSocket server URL
             ping_interval: Interval for ping messages in milliseconds
             auto_reconnect: Whether to automatically reconnect on disconnection
             web3_provider: Optional Web3 provider URL for blockchain interaction
             ssl_verify: Whether to verify SSL certificates (default: True)
+            trade_model: Model used for activity trade payloads. Pass
+                TradeLite to keep only the price, size and id fields.
+            raw: Pass decoded messages to on_message as plain dicts, skipping
+                Message construction and payload parsing (default: False)
+            compression: WebSocket compression extension, "deflate" or None
+                to disable it. Disabling compression trades bandwidth for CPU
+                and can raise throughput 2-3x on fast links.
+            max_size: Maximum size of incoming messages in bytes, or None for
+                no limit (default: 1 MiB)
+            max_queue: High-water mark of the incoming frame buffer
+            write_limit: High-water mark of the socket write buffer in bytes
+            inbox_max: Maximum number of parsed messages buffered for the
+                on_message callback. Reading pauses while the callback catches
+                up; if it makes no progress for ping_interval, messages that
+                don't fit are dropped and counted in `dropped`.
         """
         self.host = host
         self.ping_interval = ping_interval / 1000  # Convert to seconds
         self.auto_reconnect = auto_reconnect
         self.on_connect_callback = on_connect
         self.on_message_callback = on_message
-        self.websocket: Optional[WebSocketClientProtocol] = None
-        self.ping_task: Optional[asyncio.Task] = None
+        self._on_connect_is_coro = asyncio.iscoroutinefunction(on_connect)
+        self._on_message_is_coro = asyncio.iscoroutinefunction(on_message)
+        self.websocket: Optional[ClientConnection] = None
+        self.inbox_max = inbox_max
+        self.dropped = 0
+        self._seq = 0
+        self._inbox: Optional[asyncio.Queue] = None
+        self._consumer_task: Optional[asyncio.Task] = None
+        self._dispatching = False
+        self._inbox_ready: Optional[asyncio.Event] = None
+        self._consumer_stalled = False
+        # Most frames read per batch, capped so one batch always fits the inbox
+        self._batch_limit = min(MAX_BATCH_SIZE, inbox_max) if inbox_max > 0 else MAX_BATCH_SIZE
         self.running = False
         self.ssl_verify = ssl_verify
+        self.raw = raw
+        self._payload_dispatch = {
+            **_PAYLOAD_DISPATCH,
+            (_TOPIC_ACTIVITY, _TYPE_TRADES): trade_model,
+        }
+        self.compression = compression
+        self.max_size = max_size
+        self.max_queue = max_queue
+        self.write_limit = write_limit
+        self._ssl_context = self._create_ssl_context() if host.startswith("wss://") else None
         self._loop: Optional[asyncio.AbstractEventLoop] = None
         
-        # Initialize Web3 if provider is specified
-        self.web3 = Web3(Web3.HTTPProvider(web3_provider)) if web3_provider else None
+        # Initialize Web3 if provider is specified, importing it only when needed
+        self.web3 = None
+        if web3_provider:
+            from web3 import Web3
+            self.web3 = Web3(Web3.HTTPProvider(web3_provider))
 
-    def _get_loop(self) -> asyncio.AbstractEventLoop:
-        """Get the event loop for the current context."""
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+    def _create_ssl_context(self) -> ssl.SSLContext:
+        """Create the SSL context used for secure connections."""
+        ssl_context = ssl.create_default_context()
+        if self.ssl_verify:
+            import certifi
+            ssl_context.load_verify_locations(certifi.where())
+        else:
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+        return ssl_context
+
+    @staticmethod
+    def _new_loop() -> asyncio.AbstractEventLoop:
+        """Create a new event loop, using uvloop when it is installed."""
+        loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
+        if sys.version_info >= (3, 12):
+            # Run tasks eagerly up to their first suspension point
+            loop.set_task_factory(asyncio.eager_task_factory)
         return loop
 
     async def _handle_connect_callback(self):
         """Handle the connection callback safely."""
         if self.on_connect_callback:
             try:
-                if asyncio.iscoroutinefunction(self.on_connect_callback):
+                if self._on_connect_is_coro:
                     await self.on_connect_callback(self)
                 else:
-                    await asyncio.get_running_loop().run_in_executor(
-                        None, self.on_connect_callback, self
-                    )
+                    self.on_connect_callback(self)
             except Exception as e:
                 logger.error(f"Error in connect callback: {e}")
 
-    async def _handle_message_callback(self, msg: Message):
+    async def _handle_message_callback(self, msg: Union[Message, Dict[str, Any]]):
         """Handle the message callback safely."""
         if self.on_message_callback:
             try:
-                if asyncio.iscoroutinefunction(self.on_message_callback):
+                if self._on_message_is_coro:
                     await self.on_message_callback(self, msg)
                 else:
-                    await asyncio.get_running_loop().run_in_executor(
-                        None, self.on_message_callback, self, msg
-                    )
+                    self.on_message_callback(self, msg)
             except Exception as e:
                 logger.error(f"Error in message callback: {e}")
 
@@ -96,19 +184,15 @@ class PolymarketWSClient:
         
         while True:
             try:
-                # Configure SSL context
-                ssl_context = None
-                if self.host.startswith("wss://"):
-                    ssl_context = ssl.create_default_context()
-                    if self.ssl_verify:
-                        ssl_context.load_verify_locations(certifi.where())
-                    else:
-                        ssl_context.check_hostname = False
-                        ssl_context.verify_mode = ssl.CERT_NONE
-
                 async with connect(
                     self.host,
-                    ssl=ssl_context
+                    ssl=self._ssl_context,
+                    ping_interval=self.ping_interval,
+                    ping_timeout=self.ping_interval * 2,
+                    compression=self.compression,
+                    max_size=self.max_size,
+                    max_queue=self.max_queue,
+                    write_limit=self.write_limit
                 ) as websocket:
                     self.websocket = websocket
                     self.running = True
@@ -117,16 +201,22 @@ class PolymarketWSClient:
                     # Handle connect callback
                     await self._handle_connect_callback()
 
-                    # Start ping loop
-                    self.ping_task = self._loop.create_task(self._ping_loop())
+                    # Start message consumer
+                    self._inbox = asyncio.Queue(maxsize=self.inbox_max)
+                    self._inbox_ready = asyncio.Event()
+                    self._consumer_stalled = False
+                    self._consumer_task = self._loop.create_task(self._consume())
                     
                     try:
                         await self._message_loop()
+                        # Deliver what was already received before closing
+                        await self._inbox.join()
                     except Exception as e:
                         logger.error(f"Message loop error: {e}")
                     finally:
-                        if self.ping_task:
-                            self.ping_task.cancel()
+                        if self._consumer_task:
+                            self._consumer_task.cancel()
+                        self._count_unprocessed()
                             
             except Exception as e:
                 logger.error(f"Connection error: {e}")
@@ -137,62 +227,143 @@ class PolymarketWSClient:
             if not self.auto_reconnect:
                 break
 
-    async def _ping_loop(self):
-        """Send periodic ping messages to keep the connection alive."""
-        while self.running:
-            try:
-                await self.websocket.ping()
-                await asyncio.sleep(self.ping_interval)
-            except Exception as e:
-                logger.error(f"Ping error: {e}")
-                break
-
     def _parse_payload(self, topic: str, payload_type: str, payload: Dict[str, Any]) -> PayloadType:
         """Parse the message payload into the appropriate type."""
-        try:
-            if topic == "activity" and payload_type == "trades":
-                return Trade(**payload)
-            elif topic == "comments":
-                if payload_type in ["comment_created", "comment_removed"]:
-                    return Comment(**payload)
-                elif payload_type in ["reaction_created", "reaction_removed"]:
-                    return Reaction(**payload)
+        model = self._payload_dispatch.get((topic, payload_type))
+        if model is None:
             return payload
+        try:
+            return model.model_validate(payload)
         except Exception as e:
             logger.warning(f"Failed to parse payload: {e}")
             return payload
 
     async def _message_loop(self):
-        """Handle incoming messages."""
-        async for message in self.websocket:
-            if not message:
-                continue
-                
+        """Handle incoming messages in batches of already received frames."""
+        websocket = self.websocket
+        process_frame = self._process_raw_frame if self.raw else self._process_frame
+        inbox = self._inbox
+        buffered = self._frame_buffer(websocket)
+        while True:
+            if inbox.qsize() >= self._batch_limit and not self._consumer_stalled:
+                await self._wait_for_consumer()
+            room = inbox.maxsize - inbox.qsize() if inbox.maxsize > 0 else MAX_BATCH_SIZE
+            limit = max(1, min(self._batch_limit, room))
+
             try:
-                data = json.loads(message)
-                if isinstance(data, dict) and "payload" in data:
-                    topic = data.get("topic", "")
-                    msg_type = data.get("type", "")
-                    
-                    # Parse the payload into the appropriate type
-                    parsed_payload = self._parse_payload(
-                        topic, msg_type, data.get("payload", {})
-                    )
-                    
-                    msg = Message(
-                        topic=topic,
-                        type=msg_type,
-                        timestamp=data.get("timestamp", 0),
-                        payload=parsed_payload
-                    )
-                    
-                    await self._handle_message_callback(msg)
-                else:
-                    logger.debug(f"Received message: {message}")
-            except json.JSONDecodeError:
-                logger.error(f"Failed to parse message: {message}")
-            except Exception as e:
-                logger.error(f"Error processing message: {e}")
+                # Keep text frames as bytes, the JSON decoder reads them directly
+                frames = [await websocket.recv(decode=False)]
+                # recv() returns without suspending while frames are buffered
+                while buffered and len(frames) < limit:
+                    frames.append(await websocket.recv(decode=False))
+            except ConnectionClosedOK:
+                return
+
+            for message in frames:
+                process_frame(message)
+
+            # recv() may not have suspended at all, let the consumer run
+            await asyncio.sleep(0)
+
+    @staticmethod
+    def _frame_buffer(websocket: ClientConnection) -> Sized:
+        """Get the connection's queue of received frames, used to size batches.
+
+        This is a websockets internal. If it is missing, an empty tuple is
+        returned and every batch holds a single frame.
+        """
+        frames = getattr(getattr(websocket, "recv_messages", None), "frames", None)
+        if frames is None:
+            logger.debug("Frame buffer unavailable, reading one frame per batch")
+            return ()
+        return frames
+
+    async def _wait_for_consumer(self):
+        """Stop reading until the consumer has worked through the queued batch.
+
+        Unread frames stay in the socket buffers, so the server is slowed down
+        instead of messages being dropped. A callback that makes no progress
+        for ping_interval is treated as stalled: reading resumes so keepalive
+        pongs are still processed, and the overflow is dropped.
+        """
+        self._inbox_ready.clear()
+        try:
+            await asyncio.wait_for(self._inbox_ready.wait(), self.ping_interval)
+        except asyncio.TimeoutError:
+            self._consumer_stalled = True
+            logger.warning("Message callback stalled, dropping messages until it catches up")
+
+    def _process_frame(self, message: bytes):
+        """Parse a single frame and queue the resulting message."""
+        try:
+            data = _loads(message)
+        except ValueError:
+            logger.error(f"Failed to parse message: {message}")
+            return
+
+        try:
+            payload = data.get("payload") if isinstance(data, dict) else None
+            if payload is None:
+                logger.debug(f"Received message: {message}")
+                return
+
+            # Required fields are subscripted directly, only payload is optional
+            topic = data["topic"]
+            msg_type = data["type"]
+            
+            # Parse the payload into the appropriate type
+            parsed_payload = self._parse_payload(topic, msg_type, payload)
+            
+            self._enqueue(Message(topic, msg_type, data["timestamp"], parsed_payload))
+        except Exception as e:
+            logger.error(f"Error processing message: {e}")
+
+    def _process_raw_frame(self, message: bytes):
+        """Decode a single frame and queue it without further parsing."""
+        try:
+            data = _loads(message)
+        except ValueError:
+            logger.error(f"Failed to parse message: {message}")
+            return
+
+        self._enqueue(data)
+
+    def _enqueue(self, msg: Union[Message, Dict[str, Any]]):
+        """Queue a message for the consumer, dropping it if the inbox is full."""
+        self._seq += 1
+        try:
+            self._inbox.put_nowait(msg)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(
+                f"Inbox full, dropped message #{self._seq} "
+                f"({self.dropped} dropped in total)"
+            )
+
+    def _count_unprocessed(self):
+        """Count queued and in-flight messages as dropped when the consumer stops."""
+        lost = self._inbox.qsize() + self._dispatching
+        if lost:
+            self.dropped += lost
+            logger.warning(
+                f"Consumer stopped, dropped {lost} queued messages "
+                f"({self.dropped} dropped in total)"
+            )
+
+    async def _consume(self):
+        """Dispatch queued messages to the message callback."""
+        while True:
+            msg = await self._inbox.get()
+            if self._inbox.qsize() < self._batch_limit:
+                # Room for another batch, let the reader continue
+                self._consumer_stalled = False
+                self._inbox_ready.set()
+            self._dispatching = True
+            try:
+                await self._handle_message_callback(msg)
+            finally:
+                self._dispatching = False
+                self._inbox.task_done()
 
     async def disconnect(self):
         """Disconnect from the WebSocket server."""
@@ -200,17 +371,18 @@ class PolymarketWSClient:
         if self.websocket:
             await self.websocket.close()
 
+    @staticmethod
+    def _encode_subscription(action: str, msg: SubscriptionMessage) -> str:
+        """Encode a subscription request by splicing the action into the model JSON."""
+        return f'{{"action":"{action}",' + msg.model_dump_json()[1:]
+
     async def subscribe(self, msg: SubscriptionMessage):
         """Subscribe to topics."""
         if not self.websocket:
             raise RuntimeError("Not connected to WebSocket server")
             
         try:
-            subscription_dict = {
-                "action": "subscribe",
-                **msg.model_dump()
-            }
-            await self.websocket.send(json.dumps(subscription_dict))
+            await self.websocket.send(self._encode_subscription("subscribe", msg))
             logger.info(f"Subscribed to {msg.subscriptions}")
         except Exception as e:
             logger.error(f"Subscribe error: {e}")
@@ -222,11 +394,7 @@ class PolymarketWSClient:
             raise RuntimeError("Not connected to WebSocket server")
             
         try:
-            subscription_dict = {
-                "action": "unsubscribe",
-                **msg.model_dump()
-            }
-            await self.websocket.send(json.dumps(subscription_dict))
+            await self.websocket.send(self._encode_subscription("unsubscribe", msg))
             logger.info(f"Unsubscribed from {msg.subscriptions}")
         except Exception as e:
             logger.error(f"Unsubscribe error: {e}")
@@ -234,12 +402,23 @@ class PolymarketWSClient:
 
     def run(self):
         """Run the client in the current thread."""
-        loop = self._get_loop()
+        if sys.version_info >= (3, 11):
+            with asyncio.Runner(loop_factory=self._new_loop) as runner:
+                try:
+                    runner.run(self.connect())
+                except KeyboardInterrupt:
+                    logger.info("Shutting down...")
+            return
+
+        # Drive a private loop so the process-wide event loop policy is untouched
+        loop = self._new_loop()
+        main_task = loop.create_task(self.connect())
         try:
-            loop.run_until_complete(self.connect())
+            loop.run_until_complete(main_task)
         except KeyboardInterrupt:
             logger.info("Shutting down...")
-            if self.websocket:
-                loop.run_until_complete(self.disconnect())
+            main_task.cancel()
+            loop.run_until_complete(asyncio.gather(main_task, return_exceptions=True))
         finally:
-            loop.close() 
\ No newline at end of file
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
\ No newline at end of file
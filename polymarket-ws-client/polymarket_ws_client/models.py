@@ -1,6 +1,6 @@
-from typing import Optional, List, Dict, Any, Literal
-from pydantic import BaseModel, Field
-from datetime import datetime
+from dataclasses import dataclass
+from typing import Optional, List, Any, Literal
+from pydantic import BaseModel, ConfigDict, Field
 
 class ClobApiKeyCreds(BaseModel):
     key: str
@@ -20,11 +20,14 @@ class Subscription(BaseModel):
 class SubscriptionMessage(BaseModel):
     subscriptions: List[Subscription]
 
-class Message(BaseModel):
+@dataclass
+class Message:
+    __slots__ = ("topic", "type", "timestamp", "payload")
+
     topic: str
     type: str
     timestamp: int
-    payload: Dict[str, Any]
+    payload: Any
 
 class Trade(BaseModel):
     asset: str = Field(description="ERC1155 token ID of conditional token being traded")
@@ -47,6 +50,17 @@ class Trade(BaseModel):
     title: str = Field(description="Title of the event")
     transactionHash: str = Field(description="Hash of the transaction")
 
+class TradeLite(BaseModel):
+    # The remaining trade fields are discarded during validation
+    model_config = ConfigDict(extra="ignore")
+
+    asset: str = Field(description="ERC1155 token ID of conditional token being traded")
+    price: float = Field(description="Price of the trade")
+    size: int = Field(description="Size of the trade")
+    side: Literal["BUY", "SELL"] = Field(description="Side of the trade (BUY/SELL)")
+    timestamp: int = Field(description="Timestamp of the trade")
+    transactionHash: str = Field(description="Hash of the transaction")
+
 class Comment(BaseModel):
     id: str = Field(description="Unique identifier of comment")
     body: str = Field(description="Content of the comment")